@@ -6,9 +6,15 @@
 """Network Drive source module responsible to fetch documents from Network Drive."""
 
 import asyncio
-import csv
-from collections import deque
-from functools import cached_property, partial
+import hashlib
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import cached_property, lru_cache, partial
 
 import fastjsonschema
 import requests.exceptions
@@ -58,6 +64,7 @@ ACCESS_MASK_DENIED_WRITE_PERMISSION = 278
 GET_USERS_COMMAND = "Get-LocalUser | Select Name, SID"
 GET_GROUPS_COMMAND = "Get-LocalGroup | Select-Object Name, SID"
 GET_GROUP_MEMBERS = 'Get-LocalGroupMember -Name "{name}" | Select-Object Name, SID'
+GET_GROUP_MEMBERS_BATCH = 'foreach ($name in @({names})) {{ Write-Output "GROUP:$name"; Get-LocalGroupMember -Name "$name" | Select-Object Name, SID }}'
 SECURITY_INFO_DACL = 0x00000004
 STATUS_NO_LOGON_SERVERS = 3221225566
 STATUS_INVALID_LOGON_HOURS = 3221225583
@@ -65,9 +72,17 @@ STATUS_INVALID_WORKSTATION = 3221225584
 STATUS_ACCOUNT_DISABLED = 3221225586
 STATUS_PASSWORD_MUST_CHANGE = 3221226020
 
+ACCESS_CONTROL_BATCH_SIZE = 500
+DACL_CACHE_SIZE = 4096  # distinct DACLs whose reduced permissions are kept
+DOC_QUEUE_MAX_SIZE = 256  # documents buffered ahead of a lagging consumer
+DIR_CACHE_TTL = 300  # seconds before cached directory listings are re-scanned
 MAX_CHUNK_SIZE = 65536
+MAX_CONCURRENT_RULE_TRAVERSALS = 8
+SCANDIR_PIPELINE_DEPTH = 8  # directory listings kept in flight per traversal
+YIELD_THRESHOLD = 1 << 20  # bytes buffered before fetch_file_content emits a chunk
 RETRIES = 3
 RETRY_INTERVAL = 2
+IDENTITY_CACHE_TTL = 300  # seconds before cached users/groups are re-fetched
 
 WINDOWS = "windows"
 LINUX = "linux"
@@ -93,6 +108,48 @@ class NoLogonServerException(Exception):
     pass
 
 
+@lru_cache(maxsize=None)
+def _compile_glob(pattern):
+    """Translate a glob pattern into compiled regexes once.
+
+    `glob.globmatch` re-translates the pattern on every call, which is wasted
+    work when the same sync-rule pattern is checked against every directory
+    entry. The cache holds one compiled matcher per configured pattern.
+    """
+    inclusions, _ = glob.translate(pattern, flags=glob.GLOBSTAR)
+    return [re.compile(inclusion) for inclusion in inclusions]
+
+
+def _match_glob(file_path, pattern):
+    return any(matcher.match(file_path) for matcher in _compile_glob(pattern))
+
+
+@lru_cache(maxsize=None)
+def _compile_glob_union(patterns):
+    """Compile several glob patterns into one alternation regex.
+
+    Checking a path against N previously indexed rules one pattern at a time
+    costs N regex matches per entry; folding them into a single alternation
+    answers the "does any rule match" question in one pass.
+    """
+    alternatives = []
+    for pattern in patterns:
+        inclusions, _ = glob.translate(pattern, flags=glob.GLOBSTAR)
+        alternatives.extend(f"(?:{inclusion})" for inclusion in inclusions)
+    return re.compile("|".join(alternatives))
+
+
+@lru_cache(maxsize=8192)
+def _sid_to_rid(sid):
+    """Extract the RID from a SID string once per unique SID.
+
+    ACE SIDs repeat heavily across the files of a share, so the split is
+    memoized and the result interned to make downstream dict/set lookups
+    pointer-fast.
+    """
+    return sys.intern(sid.rsplit("-", 1)[-1])
+
+
 def _prefix_user(user):
     return prefix_identity("user", user)
 
@@ -163,6 +220,20 @@ class SecurityInfo:
         self.username = user
         self.server_ip = server
         self.password = password
+        self._identity_cache = {}
+
+    def _cached(self, key, fetch):
+        """Serve `fetch()` results from a per-instance TTL cache.
+
+        WinRM `run_ps` calls cost a full PowerShell round-trip, so repeated
+        identity fetches within `IDENTITY_CACHE_TTL` are served from memory.
+        """
+        hit = self._identity_cache.get(key)
+        if hit is not None and hit[1] > time.monotonic():
+            return hit[0]
+        value = fetch()
+        self._identity_cache[key] = (value, time.monotonic() + IDENTITY_CACHE_TTL)
+        return value
 
     def get_descriptor(self, file_descriptor, info):
         """Get the Security Descriptor for the opened file."""
@@ -195,6 +266,15 @@ class SecurityInfo:
             server_cert_validation="ignore",
         )
 
+    def close(self):
+        """Tear down the cached WinRM session at the end of a sync."""
+        session = self.__dict__.pop("session", None)
+        if session is None:
+            return
+        transport = getattr(session.protocol, "transport", None)
+        if transport is not None:
+            transport.close_session()
+
     def parse_output(self, raw_output):
         """
         Formats and extracts key-value pairs from raw output data.
@@ -234,29 +314,100 @@ class SecurityInfo:
         #  Ignoring initial headers with fixed length of 2
         if len(output_lines) > 2:
             for line in output_lines[3:]:
-                parts = line.rsplit(maxsplit=1)
-                if len(parts) == 2:
-                    key, value = parts
-                    key = key.strip()
-                    value = value.strip()
+                # rpartition runs at C level and avoids the per-line list that
+                # rsplit allocates - this loop is hot on multi-thousand-line dumps.
+                # PowerShell right-pads table columns, so strip trailing spaces
+                # first or the partition lands on the padding and drops the row.
+                key, _, value = line.rstrip().rpartition(" ")
+                key = key.strip()
+                value = value.strip()
+                if key and value:
                     formatted_result[key] = value
 
         return formatted_result
 
     def fetch_users(self):
+        return self._cached("users", self._fetch_users)
+
+    def _fetch_users(self):
         users = self.session.run_ps(GET_USERS_COMMAND)
         return self.parse_output(users)
 
     def fetch_groups(self):
+        return self._cached("groups", self._fetch_groups)
+
+    def _fetch_groups(self):
         groups = self.session.run_ps(GET_GROUPS_COMMAND)
 
         return self.parse_output(groups)
 
     def fetch_members(self, group_name):
+        return self._cached(
+            ("members", group_name), partial(self._fetch_members, group_name)
+        )
+
+    def _fetch_members(self, group_name):
         members = self.session.run_ps(GET_GROUP_MEMBERS.format(name=group_name))
 
         return self.parse_output(members)
 
+    def parse_members_batch(self, raw_output):
+        """Parse the output of a batched Get-LocalGroupMember invocation.
+
+        Each group's member listing is preceded by a `GROUP:<name>` marker line
+        emitted by the batch command. Lines below a marker are parsed into
+        member-name/SID pairs until the next marker.
+
+        Args:
+            raw_output (str): The raw output data to be processed.
+
+        Returns:
+            dict: A dictionary mapping each group name to its members dictionary.
+        """
+        members_per_group = {}
+        current_group = None
+        for line in raw_output.std_out.decode().splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("GROUP:"):
+                current_group = line[len("GROUP:") :]
+                members_per_group[current_group] = {}
+                continue
+            if current_group is None:
+                continue
+            parts = line.rsplit(maxsplit=1)
+            if len(parts) == 2 and parts[1].startswith("S-"):
+                name, sid = parts
+                members_per_group[current_group][name.strip()] = sid.strip()
+        return members_per_group
+
+    def fetch_members_batch(self, group_names):
+        """Fetch members for all given groups with a single PowerShell round-trip.
+
+        Args:
+            group_names (list): Names of the groups to fetch members for.
+
+        Returns:
+            dict: A dictionary mapping each group name to its members dictionary.
+        """
+        return self._cached(
+            ("members_batch", tuple(group_names)),
+            partial(self._fetch_members_batch, group_names),
+        )
+
+    def _fetch_members_batch(self, group_names):
+        names = ",".join(f"'{name}'" for name in group_names)
+        members = self.session.run_ps(GET_GROUP_MEMBERS_BATCH.format(names=names))
+
+        return self.parse_members_batch(members)
+
+
+# Authenticated sessions shared across SMBSession instances, keyed by
+# (server, user, port), so repeated syncs skip the NTLM handshake.
+_SESSION_POOL = {}
+_SESSION_POOL_LOCK = threading.Lock()
+
 
 class SMBSession:
     _connection = None
@@ -269,8 +420,17 @@ class SMBSession:
         self.session = None
         self._logger = logger
 
+    @property
+    def _pool_key(self):
+        return (self.server_ip, self.username, self.port)
+
     def create_connection(self):
-        """Creates an SMB session to the shared drive."""
+        """Creates an SMB session to the shared drive, reusing a pooled one when present."""
+        with _SESSION_POOL_LOCK:
+            pooled_session = _SESSION_POOL.get(self._pool_key)
+        if pooled_session is not None:
+            self.session = pooled_session
+            return
         try:
             self.session = smbclient.register_session(
                 server=self.server_ip,
@@ -280,6 +440,15 @@ class SMBSession:
             )
         except SMBResponseException as exception:
             self.handle_smb_response_errors(exception=exception)
+        else:
+            with _SESSION_POOL_LOCK:
+                _SESSION_POOL[self._pool_key] = self.session
+
+    def discard_session(self):
+        """Drop the pooled session for this server so the next sync re-authenticates."""
+        with _SESSION_POOL_LOCK:
+            _SESSION_POOL.pop(self._pool_key, None)
+        self.session = None
 
     def handle_smb_response_errors(self, exception):
         msg = ""
@@ -312,6 +481,42 @@ class SMBSession:
             raise
 
 
+class _DirCache:
+    """TTL cache of formatted directory listings keyed by path.
+
+    On repeated walks most of the tree is unchanged, so serving listings from
+    memory avoids re-issuing one `scandir` round-trip per directory. A
+    directory whose `change_time` observed in its parent listing differs from
+    the recorded one is evicted early, so modified subtrees are re-scanned
+    before the TTL elapses.
+    """
+
+    def __init__(self, ttl=DIR_CACHE_TTL):
+        self._ttl = ttl
+        self._listings = {}
+        self._change_times = {}
+
+    def get(self, path):
+        hit = self._listings.get(path)
+        if hit is None:
+            return None
+        listing, expires_at = hit
+        if expires_at <= time.monotonic():
+            self._listings.pop(path, None)
+            return None
+        return [dict(document) for document in listing]
+
+    def put(self, path, listing):
+        self._listings[path] = (listing, time.monotonic() + self._ttl)
+
+    def validate(self, path, change_time):
+        """Evict the cached listing for `path` when its change time moved."""
+        recorded = self._change_times.get(path)
+        if recorded is not None and recorded != change_time:
+            self._listings.pop(path, None)
+        self._change_times[path] = change_time
+
+
 class NASDataSource(BaseDataSource):
     """Network Drive"""
 
@@ -336,6 +541,8 @@ class NASDataSource(BaseDataSource):
         self.drive_type = self.configuration["drive_type"]
         self.identity_mappings = self.configuration["identity_mappings"]
         self.security_info = SecurityInfo(self.username, self.password, self.server_ip)
+        self.dir_cache = _DirCache()
+        self._dacl_cache = OrderedDict()
 
     def advanced_rules_validators(self):
         return [NetworkDriveAdvancedRulesValidator(self)]
@@ -424,14 +631,35 @@ class NASDataSource(BaseDataSource):
             },
         }
 
+    @staticmethod
+    def _extract_file_meta(smb_info):
+        """Unwrap every needed metadata value in one pass.
+
+        Each field access on the wrapped dir info costs an attribute lookup
+        plus a `get_value` call; pulling them into plain values once keeps the
+        per-file work in the traversal hot loop to a minimum.
+        """
+        fields = smb_info.fields
+        return (
+            fields["file_id"].get_value(),
+            fields["end_of_file"].get_value(),
+            fields["creation_time"].get_value(),
+            fields["change_time"].get_value(),
+        )
+
     def format_document(self, file):
-        file_details = file._dir_info.fields
+        # `scandir` already carries the directory metadata for each entry, so
+        # reading it here avoids an extra QUERY_INFO round-trip per file that a
+        # `stat` call would cost. Newer smbprotocol versions expose it as
+        # `smb_info`; fall back to the raw dir info otherwise.
+        smb_info = getattr(file, "smb_info", None) or file._dir_info
+        file_id, size, created_at, changed_at = self._extract_file_meta(smb_info)
         document = {
             "path": file.path,
-            "size": file_details["end_of_file"].get_value(),
-            "_id": file_details["file_id"].get_value(),
-            "created_at": iso_utc(file_details["creation_time"].get_value()),
-            "_timestamp": iso_utc(file_details["change_time"].get_value()),
+            "size": size,
+            "_id": file_id,
+            "created_at": iso_utc(created_at),
+            "_timestamp": iso_utc(changed_at),
             "type": "file" if file.is_file() else "folder",
             "title": file.name,
         }
@@ -454,6 +682,17 @@ class NASDataSource(BaseDataSource):
         while stack:
             current_path = stack.pop()
 
+            cached_listing = self.dir_cache.get(current_path)
+            if cached_listing is not None:
+                for document in cached_listing:
+                    yield document
+                    if document["type"] == "folder":
+                        self.dir_cache.validate(
+                            document["path"], document["_timestamp"]
+                        )
+                        stack.append(document["path"])
+                continue
+
             directory_info = []
             try:
                 directory_info = list(
@@ -461,20 +700,30 @@ class NASDataSource(BaseDataSource):
                         partial(
                             smbclient.scandir,
                             path=current_path,
+                            search_pattern="*",
                             username=self.username,
                             password=self.password,
                             port=self.port,
                         ),
                     )
                 )
+                listing = []
                 for file in directory_info:
-                    yield self.format_document(file=file)
+                    document = self.format_document(file=file)
+                    # Snapshot before yielding: consumers mutate documents in
+                    # place (DLS stamps access control onto them), and that
+                    # must not leak into the cached listing.
+                    listing.append(dict(document))
+                    yield document
                     if file.is_dir():
+                        self.dir_cache.validate(file.path, document["_timestamp"])
                         stack.append(file.path)
+                self.dir_cache.put(current_path, listing)
             except SMBConnectionClosed as exception:
                 self._logger.exception(
                     f"Connection got closed. Error {exception}. Registering new session"
                 )
+                self.smb_connection.discard_session()
                 await asyncio.to_thread(self.smb_connection.create_connection)
                 raise
             except (SMBOSError, SMBException) as exception:
@@ -487,14 +736,11 @@ class NASDataSource(BaseDataSource):
         self, file_path, indexed_rules, match_with_previous_rules
     ):
         # Check if the file is matched with any of the previous indexed rules
-        for indexed_rule in indexed_rules:
-            if not match_with_previous_rules:
-                match_with_previous_rules = glob.globmatch(
-                    file_path, indexed_rule, flags=glob.GLOBSTAR
-                )
-                if match_with_previous_rules:
-                    break
-        return match_with_previous_rules
+        if match_with_previous_rules:
+            return True
+        if not indexed_rules:
+            return False
+        return bool(_compile_glob_union(tuple(indexed_rules)).match(file_path))
 
     @retryable(
         retries=RETRIES,
@@ -502,7 +748,9 @@ class NASDataSource(BaseDataSource):
         strategy=RetryStrategy.EXPONENTIAL_BACKOFF,
         skipped_exceptions=[SMBOSError, SMBException],
     )
-    async def traverse_directory_for_syncrule(self, path, glob_pattern, indexed_rules):
+    async def traverse_directory_for_syncrule(
+        self, path, glob_pattern, indexed_rules, search_pattern="*"
+    ):
         self._logger.debug(
             "Fetching the directory tree from remote server and content of directory on path"
         )
@@ -510,41 +758,52 @@ class NASDataSource(BaseDataSource):
         stack.append(path)
 
         while stack:
-            directory_info = []
-            current_path = stack.pop()
-            try:
-                directory_info = await asyncio.to_thread(
-                    partial(
-                        smbclient.scandir,
-                        path=current_path,
-                        port=self.port,
-                    ),
-                )
+            # SMB2 lets the next command go out before the previous response
+            # lands, so list one wave of pending directories concurrently and
+            # pipeline their round-trips instead of scanning one at a time.
+            wave = [stack.pop() for _ in range(min(len(stack), SCANDIR_PIPELINE_DEPTH))]
+            listings = await asyncio.gather(
+                *[
+                    asyncio.to_thread(
+                        partial(
+                            smbclient.scandir,
+                            path=current_path,
+                            search_pattern=search_pattern,
+                            port=self.port,
+                        ),
+                    )
+                    for current_path in wave
+                ],
+                return_exceptions=True,
+            )
+            for current_path, directory_info in zip(wave, listings, strict=True):
+                if isinstance(directory_info, SMBConnectionClosed):
+                    self._logger.exception(
+                        f"Connection got closed. Error {directory_info}. Registering new session"
+                    )
+                    self.smb_connection.discard_session()
+                    await asyncio.to_thread(self.smb_connection.create_connection)
+                    raise directory_info
+                if isinstance(directory_info, (SMBOSError, SMBException)):
+                    self._logger.exception(
+                        f"Error while scanning the path {current_path}. Error {directory_info}"
+                    )
+                    continue
+                if isinstance(directory_info, BaseException):
+                    raise directory_info
                 for file in directory_info:
-                    match_with_previous_rules = False
                     if file.is_dir():
                         stack.append(file.path)
                     file_path = file.path.split("/", 1)[1].replace("\\", "/")
-                    is_file_match = glob.globmatch(
-                        file_path, glob_pattern, flags=glob.GLOBSTAR
-                    )
-                    match_with_previous_rules = self.is_match_with_previous_rules(
-                        file_path, indexed_rules, match_with_previous_rules
-                    )
-
-                    if not match_with_previous_rules and is_file_match:
-                        yield self.format_document(file=file)
-            except SMBConnectionClosed as exception:
-                self._logger.exception(
-                    f"Connection got closed. Error {exception}. Registering new session"
-                )
-                await asyncio.to_thread(self.smb_connection.create_connection)
-                raise
-            except (SMBOSError, SMBException) as exception:
-                self._logger.exception(
-                    f"Error while scanning the path {current_path}. Error {exception}"
-                )
-                continue
+                    # Entries the rule does not match are dropped here, before
+                    # the previous-rules scan or any metadata work is done.
+                    if not _match_glob(file_path, glob_pattern):
+                        continue
+                    if self.is_match_with_previous_rules(
+                        file_path, indexed_rules, False
+                    ):
+                        continue
+                    yield self.format_document(file=file)
 
     def get_base_path(self, pattern):
         wildcards = ["*", "?", "[", "{", "!", "^"]
@@ -553,6 +812,59 @@ class NASDataSource(BaseDataSource):
                 return rf"\\{self.server_ip}/{pattern[:i].rsplit('/', 1)[0]}/"
         return rf"\\{self.server_ip}/{pattern}"
 
+    def get_search_pattern(self, pattern):
+        """Derive a server-side search pattern for the leaf of a glob.
+
+        When wildcards appear only in the pattern's last segment, the SMB
+        server can filter QUERY_DIRECTORY responses itself, so only matching
+        entries cross the wire. SMB search patterns only understand `*` and
+        `?`, so leaves using glob syntax like character classes stay
+        client-side; multi-segment globs (`**` or wildcards in parent
+        segments) also fall back to listing everything.
+        """
+        wildcards = ["*", "?", "[", "{", "!", "^"]
+        smb_wildcards = ["*", "?"]
+        if "**" in pattern:
+            return "*"
+        head, _, leaf = pattern.rpartition("/")
+        if any(char in head for char in wildcards):
+            return "*"
+        if any(char in leaf for char in wildcards if char not in smb_wildcards):
+            return "*"
+        if any(char in leaf for char in smb_wildcards):
+            return leaf
+        return "*"
+
+    def collapse_subsumed_rules(self, advanced_rules):
+        """Drop rules whose walk is covered by a broader `**`-suffixed rule.
+
+        A pattern ending in `/**` already matches everything below its prefix,
+        so traversing `training/python/**` alongside `training/**` repeats the
+        same scandir calls over the shared subtree. Returns the rules left to
+        traverse and a mapping of each dropped pattern to the pattern that
+        covers it.
+        """
+        kept_rules = []
+        covered_rules = {}
+        prefixes = {}
+        for rule in sorted(advanced_rules, key=lambda rule: len(rule["pattern"])):
+            pattern = rule["pattern"].replace("\\", "/")
+            subsumer = next(
+                (
+                    broad_pattern
+                    for broad_pattern, prefix in prefixes.items()
+                    if pattern.startswith(prefix)
+                ),
+                None,
+            )
+            if subsumer is not None:
+                covered_rules[rule["pattern"]] = subsumer
+                continue
+            kept_rules.append(rule)
+            if pattern.endswith("/**"):
+                prefixes[rule["pattern"]] = pattern[: -len("**")]
+        return kept_rules, covered_rules
+
     async def fetch_filtered_directory(self, advanced_rules):
         """
         Fetch file and folder based on advanced rules.
@@ -566,24 +878,66 @@ class NASDataSource(BaseDataSource):
         self._logger.debug(
             "Fetching the matched directory/files using the list of advanced rules configured"
         )
-        unmatched_rules = set()
-        indexed_rules = set()
-        for rule in advanced_rules:
-            rule_matched = False
+        # The queue is bounded so a lagging consumer pauses the SMB walks
+        # instead of letting documents pile up for an arbitrarily large share.
+        queue = asyncio.Queue(maxsize=DOC_QUEUE_MAX_SIZE)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_RULE_TRAVERSALS)
+
+        async def traverse_rule(rule):
             glob_pattern = rule["pattern"].replace("\\", "/")
             base_path = self.get_base_path(pattern=glob_pattern)
-            async for document in self.traverse_directory_for_syncrule(
-                path=base_path,
-                glob_pattern=glob_pattern,
-                indexed_rules=indexed_rules,
-            ):
+            search_pattern = self.get_search_pattern(pattern=glob_pattern)
+            async with semaphore:
+                async for document in self.traverse_directory_for_syncrule(
+                    path=base_path,
+                    glob_pattern=glob_pattern,
+                    indexed_rules=[],
+                    search_pattern=search_pattern,
+                ):
+                    await queue.put((rule["pattern"], document))
+
+        # The traversals for each rule are independent SMB walks, so run them
+        # concurrently (bounded by the semaphore) and consume from one queue.
+        # Documents matched by several overlapping rules are deduplicated on
+        # their path before being yielded.
+        rules_to_traverse, covered_rules = self.collapse_subsumed_rules(advanced_rules)
+        tasks = [asyncio.create_task(traverse_rule(rule)) for rule in rules_to_traverse]
+        gathered = asyncio.gather(*tasks)
+
+        async def signal_done():
+            # put() rather than put_nowait(): the queue may be momentarily
+            # full of real documents when the last traversal finishes.
+            try:
+                await gathered
+            finally:
+                await queue.put(None)
+
+        signal_task = asyncio.create_task(signal_done())
+
+        matched_rules = set()
+        seen_paths = set()
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                pattern, document = item
+                matched_rules.add(pattern)
+                if document["path"] in seen_paths:
+                    continue
+                seen_paths.add(document["path"])
                 yield document
-                rule_matched = True
+            await gathered
+        finally:
+            gathered.cancel()
+            signal_task.cancel()
 
-            if not rule_matched:
-                unmatched_rules.add(rule["pattern"])
-            indexed_rules.add(glob_pattern)
+        # A subsumed rule is satisfied whenever the rule covering it matched.
+        for pattern, subsumer in covered_rules.items():
+            if subsumer in matched_rules:
+                matched_rules.add(pattern)
 
+        unmatched_rules = {rule["pattern"] for rule in advanced_rules} - matched_rules
         if len(unmatched_rules) > 0:
             self._logger.warning(
                 f"Following advanced rules do not match with any path present in network drive or the rule is similar to another rule: {unmatched_rules}"
@@ -604,7 +958,8 @@ class NASDataSource(BaseDataSource):
         self._logger.info("Successfully connected to the Network Drive")
 
     async def close(self):
-        """Close all the open smb sessions"""
+        """Close all the open smb and WinRM sessions"""
+        self.security_info.close()
         if self.smb_connection.session is None:
             return
         loop = asyncio.get_running_loop()
@@ -614,28 +969,55 @@ class NASDataSource(BaseDataSource):
                 smbclient.delete_session, server=self.server_ip, port=self.port
             ),
         )
+        self.smb_connection.discard_session()
 
     async def fetch_file_content(self, path):
         """Fetches the file content from the given drive path
 
+        Reads run in worker threads so the event loop is never blocked on an
+        SMB round-trip, and the next chunk is already in flight while the
+        current one is consumed downstream.
+
         Args:
             path (str): The file path of the file on the Network Drive
         """
         self._logger.debug(f"Fetching the contents of file on path: {path}")
         try:
-            with smbclient.open_file(
-                path=path,
-                encoding="utf-8",
-                errors="ignore",
-                mode="rb",
-                username=self.username,
-                password=self.password,
-                port=self.port,
-            ) as file:
-                chunk = True
-                while chunk:
-                    chunk = file.read(MAX_CHUNK_SIZE) or b""
-                    yield chunk
+            file_handle = await asyncio.to_thread(
+                partial(
+                    smbclient.open_file,
+                    path=path,
+                    encoding="utf-8",
+                    errors="ignore",
+                    mode="rb",
+                    username=self.username,
+                    password=self.password,
+                    port=self.port,
+                )
+            )
+            with file_handle as file:
+                next_chunk = asyncio.create_task(
+                    asyncio.to_thread(file.read, MAX_CHUNK_SIZE)
+                )
+                # SMB reads arrive in 64 KB chunks; buffer them up to
+                # YIELD_THRESHOLD so downstream iterates far fewer times.
+                buffer = bytearray()
+                try:
+                    while True:
+                        chunk = await next_chunk
+                        if not chunk:
+                            break
+                        next_chunk = asyncio.create_task(
+                            asyncio.to_thread(file.read, MAX_CHUNK_SIZE)
+                        )
+                        buffer.extend(chunk)
+                        if len(buffer) >= YIELD_THRESHOLD:
+                            yield bytes(buffer)
+                            buffer.clear()
+                    if buffer:
+                        yield bytes(buffer)
+                finally:
+                    next_chunk.cancel()
         except SMBOSError as error:
             self._logger.error(
                 f"Cannot read the contents of file on path:{path}. Error {error}"
@@ -676,20 +1058,28 @@ class NASDataSource(BaseDataSource):
             partial(self.fetch_file_content, path=file["path"]),
         )
 
-    def list_file_permission(self, file_path, file_type, mode, access):
+    def list_file_permission(self, file_path, file_type, access):
         try:
+            # Only the security descriptor is read here, so the open asks for
+            # READ_CONTROL alone and shares the handle with readers, writers
+            # and deleters — files locked by other clients still yield a DACL.
             with smbclient.open_file(
                 file_path,
-                mode=mode,
+                mode="rb",
                 buffering=0,
                 file_type=file_type,
                 desired_access=access,
+                share_access="rwd",
                 port=self.port,
             ) as file:
                 descriptor = self.security_info.get_descriptor(
                     file_descriptor=file.fd, info=SECURITY_INFO_DACL
                 )
-                return descriptor.get_dacl()["aces"]
+                # Children overwhelmingly inherit their parent's DACL, so the
+                # digest of the raw descriptor bytes identifies it cheaply and
+                # lets the caller reuse an already-reduced permission set.
+                digest = hashlib.sha1(descriptor.pack()).digest()  # noqa S324
+                return descriptor.get_dacl()["aces"], digest
         except SMBOSError as error:
             self._logger.error(
                 f"Cannot read the contents of file on path:{file_path}. Error {error}"
@@ -711,20 +1101,20 @@ class NASDataSource(BaseDataSource):
             allow_permissions, deny_permissions = await self.get_entity_permission(
                 file_path=file_path, file_type=file_type, groups_info=groups_info
             )
-            entity_permissions = list(set(allow_permissions) - set(deny_permissions))
-            document[ACCESS_CONTROL] = list(
-                set(document.get(ACCESS_CONTROL, []) + entity_permissions)
+            entity_permissions = allow_permissions - deny_permissions
+            document[ACCESS_CONTROL] = sorted(
+                entity_permissions.union(document.get(ACCESS_CONTROL, []))
             )
         return document
 
     async def _user_access_control_doc(self, user, sid, groups_info=None):
-        rid = str(sid).split("-")[-1]
+        rid = _sid_to_rid(str(sid))
         prefixed_username = _prefix_user(user)
         rid_user = _prefix_rid(rid)
         rid_groups = []
 
         for group_sid in groups_info or []:
-            rid_groups.append(_prefix_rid(group_sid.split("-")[-1]))
+            rid_groups.append(_prefix_rid(_sid_to_rid(group_sid)))
 
         access_control = [rid_user, prefixed_username, *rid_groups]
 
@@ -738,37 +1128,72 @@ class NASDataSource(BaseDataSource):
         } | es_access_control_query(access_control)
 
     def read_user_info_csv(self):
-        with open(self.identity_mappings, encoding="utf-8") as file:
-            user_info = []
-            try:
-                csv_reader = csv.reader(file, delimiter=";")
-                for row in csv_reader:
-                    if row:
-                        user_info.append(
-                            {
-                                "name": row[0],
-                                "user_sid": row[1],
-                                "groups": row[2].split(",") if len(row[2]) > 0 else [],
-                            }
-                        )
-            except csv.Error as e:
-                self._logger.exception(
-                    f"Error while reading user mapping file at the location: {self.identity_mappings}. Error: {e}"
-                )
-            return user_info
+        """Stream one user-info dictionary per row of the identity mappings CSV.
+
+        The file is mapped read-only and scanned for `;`/newline offsets with
+        `find`, so rows are sliced straight out of the OS page cache and only
+        the three fields of each row are ever decoded; memory stays flat
+        regardless of the CSV size.
+        """
+        with open(self.identity_mappings, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                try:
+                    pos = 0
+                    while pos < size:
+                        eol = mapped.find(b"\n", pos)
+                        if eol == -1:
+                            eol = size
+                        end = eol
+                        if end > pos and mapped[end - 1] == ord("\r"):
+                            end -= 1
+                        if end == pos:
+                            pos = eol + 1
+                            continue
+                        first = mapped.find(b";", pos, end)
+                        second = mapped.find(b";", first + 1, end)
+                        if first == -1 or second == -1:
+                            msg = f"Malformed row at byte offset {pos}"
+                            raise ValueError(msg)
+                        groups = mapped[second + 1 : end]
+                        yield {
+                            "name": mapped[pos:first].decode("utf-8"),
+                            "user_sid": mapped[first + 1 : second].decode("utf-8"),
+                            "groups": groups.decode("utf-8").split(",")
+                            if groups
+                            else [],
+                        }
+                        pos = eol + 1
+                except ValueError as e:
+                    self._logger.exception(
+                        f"Error while reading user mapping file at the location: {self.identity_mappings}. Error: {e}"
+                    )
 
     async def fetch_groups_info(self):
         self._logger.info(
             f"Fetching all groups and members for drive at path '{self.drive_path}'"
         )
+        # Cached DACL reductions embed expanded group membership, so a fresh
+        # groups snapshot invalidates everything cached from the previous one.
+        self._dacl_cache.clear()
         groups_info = await asyncio.to_thread(self.security_info.fetch_groups)
 
+        members_per_group = await asyncio.to_thread(
+            self.security_info.fetch_members_batch, list(groups_info.keys())
+        )
+
+        # Flatten each group into the set of already-prefixed member RIDs so
+        # the per-ACE permission mapping is a plain O(1) lookup with no
+        # per-member string work left to do.
         groups_members = {}
         for group_name, group_sid in groups_info.items():
-            rid = group_sid.split("-")[-1]
-            groups_members[rid] = await asyncio.to_thread(
-                self.security_info.fetch_members, group_name
-            )
+            rid = _sid_to_rid(group_sid)
+            members = members_per_group.get(group_name, {})
+            groups_members[rid] = {
+                _prefix_rid(_sid_to_rid(member_sid)) for member_sid in members.values()
+            }
 
         return groups_members
 
@@ -784,7 +1209,13 @@ class NASDataSource(BaseDataSource):
                     f"Fetching all groups and users from configured file path '{self.identity_mappings}'"
                 )
 
+                seen_sids = set()
                 for user in self.read_user_info_csv():
+                    # Rows referencing an already-emitted SID would produce a
+                    # duplicate doc; skip them before building the document.
+                    if user["user_sid"] in seen_sids:
+                        continue
+                    seen_sids.add(user["user_sid"])
                     yield await self._user_access_control_doc(
                         user=user["name"],
                         sid=user["user_sid"],
@@ -800,11 +1231,19 @@ class NASDataSource(BaseDataSource):
                 )
                 users_info = await asyncio.to_thread(self.security_info.fetch_users)
 
-                for user, sid in users_info.items():
-                    yield await self._user_access_control_doc(
-                        user=user,
-                        sid=sid,
+                # Build the docs one batch at a time instead of awaiting each
+                # user individually, cutting per-item scheduling overhead.
+                users = list(users_info.items())
+                for batch_start in range(0, len(users), ACCESS_CONTROL_BATCH_SIZE):
+                    batch = users[batch_start : batch_start + ACCESS_CONTROL_BATCH_SIZE]
+                    user_docs = await asyncio.gather(
+                        *[
+                            self._user_access_control_doc(user=user, sid=sid)
+                            for user, sid in batch
+                        ]
                     )
+                    for user_doc in user_docs:
+                        yield user_doc
             except requests.exceptions.ConnectionError as exception:
                 msg = "Something went wrong"
                 raise requests.exceptions.ConnectionError(msg) from exception
@@ -820,56 +1259,64 @@ class NASDataSource(BaseDataSource):
         if not self._dls_enabled():
             return []
 
-        allow_permissions = []
-        deny_permissions = []
         if file_type == "file":
-            list_permissions = await asyncio.to_thread(
+            fetched = await asyncio.to_thread(
                 self.list_file_permission,
                 file_path=file_path,
                 file_type="file",
-                mode="rb",
                 access=FilePipePrinterAccessMask.READ_CONTROL,
             )
         else:
-            list_permissions = await asyncio.to_thread(
+            fetched = await asyncio.to_thread(
                 self.list_file_permission,
                 file_path=file_path,
                 file_type="dir",
-                mode="br",
                 access=DirectoryAccessMask.READ_CONTROL,
             )
-        for permission in list_permissions or []:
-            # Access mask indicates specific permission within an ACE, such as read in deny ACE.
-            mask = permission["mask"].value
-
-            # Determine the type of ACE (access control entry), i.e, allow or deny
-            ace_type = permission["ace_type"].value
-
-            # Extract RID from SID. RID uniquely identifying a user or group within a domain.
-            rid = str(permission["sid"]).split("-")[-1]
-
-            if groups_info.get(rid):
-                # If the RID corresponds to a group, get the RIDs of all members of that group
-                permissions = [
-                    _prefix_rid(member_id.split("-")[-1])
-                    for member_id in groups_info[rid].values()
-                ]
-            else:
-                # Else the RID corresponds to a user, hence we use it directly.
-                permissions = [_prefix_rid(rid)]
-            if (
-                ace_type == ACCESS_ALLOWED_TYPE
-                or mask == ACCESS_MASK_DENIED_WRITE_PERMISSION
-            ):
-                allow_permissions.extend(permissions)
+        list_permissions, dacl_key = fetched or ([], None)
+
+        # Files with byte-identical descriptors — the norm, since children
+        # inherit their parent's DACL — reduce to the same permission lists,
+        # so the reduction is cached per digest and flushed whenever the
+        # groups snapshot is refreshed.
+        if dacl_key is not None:
+            cached = self._dacl_cache.get(dacl_key)
+            if cached is not None:
+                self._dacl_cache.move_to_end(dacl_key)
+                return cached
+
+        def expand(permission):
+            # Extract RID from SID. RID uniquely identifying a user or group
+            # within a domain. A group RID expands to its members, which are
+            # already stored as prefixed RIDs; a user RID is used directly.
+            rid = _sid_to_rid(str(permission["sid"]))
+            return groups_info.get(rid) or (_prefix_rid(rid),)
+
+        # An ACE allows when its type is allow, or when it only denies write
+        # access; everything else denies. Reducing via set difference keeps the
+        # per-ACE work in two comprehensions instead of a branching loop.
+        allow_permissions = {
+            prefixed_rid
+            for permission in list_permissions or []
+            if permission["ace_type"].value == ACCESS_ALLOWED_TYPE
+            or permission["mask"].value == ACCESS_MASK_DENIED_WRITE_PERMISSION
+            for prefixed_rid in expand(permission)
+        }
+        deny_permissions = {
+            prefixed_rid
+            for permission in list_permissions or []
+            if permission["ace_type"].value == ACCESS_DENIED_TYPE
+            and permission["mask"].value != ACCESS_MASK_DENIED_WRITE_PERMISSION
+            for prefixed_rid in expand(permission)
+        }
 
-            if (
-                ace_type == ACCESS_DENIED_TYPE
-                and mask != ACCESS_MASK_DENIED_WRITE_PERMISSION
-            ):
-                deny_permissions.extend(permissions)
+        reduced = (allow_permissions, deny_permissions)
+        if dacl_key is not None:
+            self._dacl_cache[dacl_key] = reduced
+            if len(self._dacl_cache) > DACL_CACHE_SIZE:
+                self._dacl_cache.popitem(last=False)
 
-        return allow_permissions, deny_permissions
+        return reduced
 
     async def get_docs(self, filtering=None):
         """Executes the logic to fetch files and folders in async manner.
@@ -5,8 +5,10 @@
 #
 """SharePoint source module responsible to fetch documents from SharePoint Server."""
 
-import os
+import asyncio
+import random
 import re
+from collections import OrderedDict
 from functools import partial
 from urllib.parse import quote
 
@@ -34,6 +36,12 @@ RETRY_INTERVAL = 2
 DEFAULT_RETRY_SECONDS = 30
 RETRIES = 3
 TOP = 5000
+MAX_KEEPALIVE_CONNECTIONS = 32
+MAX_CONNECTIONS = 64
+MAX_CONCURRENT_SITE_CRAWLS = 8
+TIKA_SUPPORTED_EXTENSIONS = frozenset(TIKA_SUPPORTED_FILETYPES)
+DOC_QUEUE_MAX_SIZE = 256
+SITE_ACCESS_CONTROL_CACHE_SIZE = 1024
 PING = "ping"
 SITE = "site"
 SITES = "sites"
@@ -82,7 +90,7 @@ URLS = {
     DRIVE_ITEM: "{parent_site_url}/_api/web/lists(guid'{list_id}')/items?$select={selected_field}&$expand=File,Folder,Author,Editor&$top={top}",
     LIST_ITEM: "{parent_site_url}/_api/web/lists(guid'{list_id}')/items?$expand=AttachmentFiles,Author,Editor&$select=*,FileRef,Author/Title,Editor/Title",
     ATTACHMENT_DATA: "{parent_site_url}/_api/web/getfilebyserverrelativeurl('{file_relative_url}')",
-    USERS: "{parent_site_url}/_api/web/siteusers?$skip={skip}&$top={top}",
+    USERS: "{parent_site_url}/_api/web/siteusers?$skip={skip}&$top={top}&$filter=PrincipalType eq 1",
     ADMIN_USERS: "{parent_site_url}/_api/web/siteusers?$skip={skip}&$top={top}&$filter=IsSiteAdmin eq true",
     ROLES: "{parent_site_url}/_api/web/roleassignments?$expand=Member/users,RoleDefinitionBindings&$skip={skip}&$top={top}",
     UNIQUE_ROLES: "{parent_site_url}/_api/lists/GetByTitle('{site_list_name}')/HasUniqueRoleAssignments",
@@ -185,6 +193,10 @@ class SharepointServerClient:
             verify=self.ssl_ctx,
             headers=request_headers,
             timeout=timeout,
+            limits=httpx.Limits(
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=MAX_CONNECTIONS,
+            ),
         )
         return self.session
 
@@ -214,10 +226,12 @@ class SharepointServerClient:
     async def close_session(self):
         """Closes unclosed client session"""
         self._sleeps.cancel()
-        if self.session is None:
+        # Swap the session out before awaiting so a concurrent or repeated
+        # close finds None instead of racing on the same aclose().
+        session, self.session = self.session, None
+        if session is None:
             return
-        await self.session.aclose()  # pyright: ignore
-        self.session = None
+        await session.aclose()  # pyright: ignore
 
     async def _api_call(self, url_name, url="", **url_kwargs):
         """Make an API call to the SharePoint Server
@@ -233,6 +247,7 @@ class SharepointServerClient:
             data: API response.
         """
         retry = 1
+        delay = RETRY_INTERVAL
         # If pagination happens for list and drive items then next pagination url comes in response which will be passed in url field.
         if url == "":
             url = URLS[url_name].format(**url_kwargs)
@@ -241,16 +256,29 @@ class SharepointServerClient:
         while True:
             try:
                 self._get_session()
-                result = await self.session.get(  # pyright: ignore
-                    url=url,
-                    headers=headers,
-                )
-                if result.is_success is False:
-                    msg = f"Error accessing {url}: {result.reason_phrase}"
-                    raise Exception(msg)
                 if url_name == ATTACHMENT:
+                    # Stream attachment bodies instead of buffering them in
+                    # memory; the consumer iterates aiter_bytes and closes
+                    # the response when the download finishes.
+                    request = self.session.build_request(  # pyright: ignore
+                        "GET", url, headers=headers
+                    )
+                    result = await self.session.send(  # pyright: ignore
+                        request, stream=True
+                    )
+                    if result.is_success is False:
+                        await result.aclose()
+                        msg = f"Error accessing {url}: {result.reason_phrase}"
+                        raise Exception(msg)
                     yield result
                 else:
+                    result = await self.session.get(  # pyright: ignore
+                        url=url,
+                        headers=headers,
+                    )
+                    if result.is_success is False:
+                        msg = f"Error accessing {url}: {result.reason_phrase}"
+                        raise Exception(msg)
                     yield result.json()
                 break
             except Exception as exception:
@@ -266,7 +294,14 @@ class SharepointServerClient:
                 )
                 retry += 1
 
-                await self._sleeps.sleep(RETRY_INTERVAL**retry)
+                # Decorrelated jitter: spread retries between the base
+                # interval and triple the previous delay, capped, so
+                # concurrent syncs don't re-hit the server in lockstep.
+                delay = min(
+                    DEFAULT_RETRY_SECONDS,
+                    random.uniform(RETRY_INTERVAL, delay * 3),  # noqa S311
+                )
+                await self._sleeps.sleep(delay)
 
     async def _fetch_data_with_next_url(
         self, site_url, list_id, param_name, selected_field=""
@@ -399,15 +434,13 @@ class SharepointServerClient:
         )
 
     def verify_filename_for_extraction(self, filename, relative_url):
-        attachment_extension = list(os.path.splitext(filename))
-        if "" in attachment_extension:
-            attachment_extension.remove("")
-        if "." not in filename:
+        _, dot, extension = filename.rpartition(".")
+        if not dot:
             self._logger.warning(
                 f"Files without extension are not supported by TIKA, skipping {filename}."
             )
             return
-        if attachment_extension[-1].lower() not in TIKA_SUPPORTED_FILETYPES:
+        if f".{extension.lower()}" not in TIKA_SUPPORTED_EXTENSIONS:
             return
         return relative_url
 
@@ -616,6 +649,7 @@ class SharepointServerDataSource(BaseDataSource):
         super().__init__(configuration=configuration)
         self.sharepoint_client = SharepointServerClient(configuration=configuration)
         self.invalid_collections = []
+        self._site_access_control_cache = OrderedDict()
 
     def _set_internal_logger(self):
         self.sharepoint_client.set_logger(self._logger)
@@ -938,6 +972,14 @@ class SharepointServerDataSource(BaseDataSource):
         if not self._dls_enabled():
             return [], []
 
+        # get_docs resolves the same site twice (site discovery and the
+        # later crawl) and nested webs repeat parent URLs, so the resolved
+        # role assignments are cached per site for the crawl.
+        cached = self._site_access_control_cache.get(site_url)
+        if cached is not None:
+            self._site_access_control_cache.move_to_end(site_url)
+            return cached
+
         def _is_site_admin(user):
             return user.get("IsSiteAdmin", False)
 
@@ -965,7 +1007,11 @@ class SharepointServerDataSource(BaseDataSource):
                 await self._access_control_for_member(member)
             )
 
-        return list(access_control), list(site_admins_access_control)
+        resolved = list(access_control), list(site_admins_access_control)
+        self._site_access_control_cache[site_url] = resolved
+        if len(self._site_access_control_cache) > SITE_ACCESS_CONTROL_CACHE_SIZE:
+            self._site_access_control_cache.popitem(last=False)
+        return resolved
 
     async def close(self):
         """Closes unclosed client session"""
@@ -1246,10 +1292,7 @@ class SharepointServerDataSource(BaseDataSource):
         for collection in self.sharepoint_client.site_collections:
             async for site_data in self.sharepoint_client.get_site(site_url=collection):
                 sites.append(site_data)
-                (
-                    site_access_control,
-                    site_admin_access_control,
-                ) = await self._site_access_control(
+                site_access_control, _ = await self._site_access_control(
                     site_url=f'{self.sharepoint_client.host_url}{site_data.get("ServerRelativeUrl")}'
                 )
                 site_document = self._decorate_with_access_control(
@@ -1260,112 +1303,150 @@ class SharepointServerDataSource(BaseDataSource):
                 site_url=collection
             ):
                 sites.append(site_data)
-                (
-                    site_access_control,
-                    site_admin_access_control,
-                ) = await self._site_access_control(
+                site_access_control, _ = await self._site_access_control(
                     site_url=f'{self.sharepoint_client.host_url}{site_data.get("ServerRelativeUrl")}'
                 )
                 site_document = self._decorate_with_access_control(
                     self.format_sites(item=site_data), site_access_control
                 )
                 yield site_document, None
-        for site in sites:
-            site_url = site["Url"]
-            server_relative_url = site["ServerRelativeUrl"]
-            (
-                site_access_control,
-                site_admin_access_control,
-            ) = await self._site_access_control(site_url)
-            async for result, site_list_access_control in self.get_lists(
-                site_url=site_url, site_access_control=site_access_control
-            ):
-                is_site_page = False
-                selected_field = "*,Author/Name,Editor/Name,Author/Id,Editor/Id"
-                list_relative_url = self.sharepoint_client.fix_relative_url(
-                    server_relative_url,
-                    result["RootFolder"]["ServerRelativeUrl"],
-                )
-                # if BaseType value is 1 then it's document library else it's a list
-                if result.get("BaseType") == 1:
-                    if result.get("Title") == "Site Pages":
-                        is_site_page = True
-                        selected_field = SELECTED_FIELDS
-                    yield (
-                        self.format_lists(
-                            item=result,
-                            document_type=DOCUMENT_LIBRARY,
-                            admin_access_control=site_admin_access_control.copy(),
-                            site_list_access_control=site_list_access_control.copy(),
-                            site_url=site_url,
-                            list_relative_url=list_relative_url,
-                        ),
-                        None,
-                    )
-                    list_relative_url = None
-                    func = self.sharepoint_client.get_drive_items
-                    format_document = self.format_drive_item
-                else:
-                    yield (
-                        self.format_lists(
-                            item=result,
-                            document_type=LISTS,
-                            admin_access_control=site_admin_access_control.copy(),
-                            site_list_access_control=site_list_access_control.copy(),
-                            site_url=site_url,
-                            list_relative_url=list_relative_url,
-                        ),
-                        None,
-                    )
-                    func = self.sharepoint_client.get_list_items
-                    format_document = self.format_list_item
-                async for item, file_relative_url in func(
-                    list_id=result.get("Id"),
-                    site_url=f"{self.sharepoint_client.host_url}{result.get('ParentWebUrl')}",
-                    server_relative_url=server_relative_url,
-                    list_relative_url=list_relative_url,
-                    selected_field=selected_field,
-                ):
-                    document = format_document(
-                        item=item,
+        # Each site's lists and items are fetched through independent HTTP
+        # calls, so crawl sites concurrently (bounded by the semaphore) and
+        # stream their documents through one bounded queue; a lagging
+        # consumer pauses the crawls instead of letting documents pile up.
+        queue = asyncio.Queue(maxsize=DOC_QUEUE_MAX_SIZE)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SITE_CRAWLS)
+
+        async def crawl_site(site):
+            async with semaphore:
+                async for document in self._site_docs(site=site):
+                    await queue.put(document)
+
+        tasks = [asyncio.create_task(crawl_site(site)) for site in sites]
+        gathered = asyncio.gather(*tasks)
+
+        async def signal_done():
+            # put() rather than put_nowait(): the queue may be momentarily
+            # full of real documents when the last crawl finishes.
+            try:
+                await gathered
+            finally:
+                await queue.put(None)
+
+        signal_task = asyncio.create_task(signal_done())
+
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+            await gathered
+        finally:
+            gathered.cancel()
+            signal_task.cancel()
+
+    async def _site_docs(self, site):
+        """Yield the list, list item and drive item documents of one site.
+
+        Yields:
+            tuple: document and its optional content downloader.
+        """
+        site_url = site["Url"]
+        server_relative_url = site["ServerRelativeUrl"]
+        (
+            site_access_control,
+            site_admin_access_control,
+        ) = await self._site_access_control(site_url)
+        async for result, site_list_access_control in self.get_lists(
+            site_url=site_url, site_access_control=site_access_control
+        ):
+            is_site_page = False
+            selected_field = "*,Author/Name,Editor/Name,Author/Id,Editor/Id"
+            list_relative_url = self.sharepoint_client.fix_relative_url(
+                server_relative_url,
+                result["RootFolder"]["ServerRelativeUrl"],
+            )
+            # if BaseType value is 1 then it's document library else it's a list
+            if result.get("BaseType") == 1:
+                if result.get("Title") == "Site Pages":
+                    is_site_page = True
+                    selected_field = SELECTED_FIELDS
+                yield (
+                    self.format_lists(
+                        item=result,
+                        document_type=DOCUMENT_LIBRARY,
+                        admin_access_control=site_admin_access_control.copy(),
+                        site_list_access_control=site_list_access_control.copy(),
                         site_url=site_url,
-                        server_relative_url=server_relative_url,
-                    )
-                    list_item_access_control = await self.fetch_list_item_permission(
+                        list_relative_url=list_relative_url,
+                    ),
+                    None,
+                )
+                list_relative_url = None
+                func = self.sharepoint_client.get_drive_items
+                format_document = self.format_drive_item
+            else:
+                yield (
+                    self.format_lists(
+                        item=result,
+                        document_type=LISTS,
+                        admin_access_control=site_admin_access_control.copy(),
+                        site_list_access_control=site_list_access_control.copy(),
                         site_url=site_url,
-                        site_list_name=result.get("Title"),
-                        list_item_id=item.get("Id", 0),
-                        site_access_control=site_access_control.copy(),
-                    )
-                    # Always include site admins in list item access controls
-                    list_item_access_control.extend(site_admin_access_control)
+                        list_relative_url=list_relative_url,
+                    ),
+                    None,
+                )
+                func = self.sharepoint_client.get_list_items
+                format_document = self.format_list_item
+            async for item, file_relative_url in func(
+                list_id=result.get("Id"),
+                site_url=f"{self.sharepoint_client.host_url}{result.get('ParentWebUrl')}",
+                server_relative_url=server_relative_url,
+                list_relative_url=list_relative_url,
+                selected_field=selected_field,
+            ):
+                document = format_document(
+                    item=item,
+                    site_url=site_url,
+                    server_relative_url=server_relative_url,
+                )
+                list_item_access_control = await self.fetch_list_item_permission(
+                    site_url=site_url,
+                    site_list_name=result.get("Title"),
+                    list_item_id=item.get("Id", 0),
+                    site_access_control=site_access_control.copy(),
+                )
+                # Always include site admins in list item access controls
+                list_item_access_control.extend(site_admin_access_control)
 
-                    self._decorate_with_access_control(
-                        document, list(set(list_item_access_control))
-                    )
+                self._decorate_with_access_control(
+                    document, list(set(list_item_access_control))
+                )
 
-                    if file_relative_url is None:
-                        yield document, None
-                    else:
-                        if is_site_page:
-                            yield (
+                if file_relative_url is None:
+                    yield document, None
+                else:
+                    if is_site_page:
+                        yield (
+                            document,
+                            partial(
+                                self.get_site_pages_content,
                                 document,
-                                partial(
-                                    self.get_site_pages_content,
-                                    document,
-                                    item,
-                                ),
-                            )
-                        else:
-                            yield (
+                                item,
+                            ),
+                        )
+                    else:
+                        yield (
+                            document,
+                            partial(
+                                self.get_content,
                                 document,
-                                partial(
-                                    self.get_content,
-                                    document,
-                                    file_relative_url,
-                                    site_url,
-                                ),
-                            )
+                                file_relative_url,
+                                site_url,
+                            ),
+                        )
 
     async def get_content(
         self, document, file_relative_url, site_url, timestamp=None, doit=False
@@ -1474,5 +1555,8 @@ class SharepointServerDataSource(BaseDataSource):
         This should not be used for downloads that use other methods.
         """
         async for response in download_func():
-            async for data in response.aiter_bytes(CHUNK_SIZE):
-                yield data
+            try:
+                async for data in response.aiter_bytes(CHUNK_SIZE):
+                    yield data
+            finally:
+                await response.aclose()
@@ -6,8 +6,10 @@
 """Tests the Network Drive source class methods."""
 
 import asyncio
-import csv
 import datetime
+import hashlib
+import threading
+from types import SimpleNamespace
 from unittest import mock
 from unittest.mock import ANY, MagicMock
 
@@ -25,6 +27,8 @@ from connectors.filtering.validation import SyncRuleValidationResult
 from connectors.protocol import Filter
 from connectors.source import ConfigurableFieldValueError
 from connectors.sources.network_drive import (
+    _SESSION_POOL,
+    YIELD_THRESHOLD,
     ClientPermissionException,
     InvalidLogonHoursException,
     NASDataSource,
@@ -46,6 +50,13 @@ WINDOWS = "windows"
 LINUX = "linux"
 
 
+@pytest.fixture(autouse=True)
+def reset_smb_session_pool():
+    _SESSION_POOL.clear()
+    yield
+    _SESSION_POOL.clear()
+
+
 class InvalidLogonHours(SMBResponseException):
     _STATUS_CODE = 3221225583
 
@@ -66,33 +77,34 @@ class PasswordMustChange(SMBResponseException):
     _STATUS_CODE = 3221226020
 
 
+def mock_smb_field(value):
+    """Wraps a plain value the way smbprotocol field objects do."""
+    return SimpleNamespace(get_value=lambda: value)
+
+
 def mock_file(name):
     """Generates the smbprotocol object for a file
 
     Args:
         name (str): The name of the mocked file
     """
-    mock_response = mock.Mock()
-    mock_response.name = name
-    mock_response.path = f"\\1.2.3.4/dummy_path/{name}"
-    mock_stats = {}
-    mock_stats["file_id"] = mock.Mock()
-    mock_stats["file_id"].get_value.return_value = "1"
-    mock_stats["end_of_file"] = mock.Mock()
-    mock_stats["end_of_file"].get_value.return_value = "30"
-    mock_stats["creation_time"] = mock.Mock()
-    mock_stats["creation_time"].get_value.return_value = datetime.datetime(
-        2022, 1, 11, 12, 12, 30
-    )
-    mock_stats["change_time"] = mock.Mock()
-    mock_stats["change_time"].get_value.return_value = datetime.datetime(
-        2022, 4, 21, 12, 12, 30
+    smb_info = SimpleNamespace(
+        fields={
+            "file_id": mock_smb_field("1"),
+            "end_of_file": mock_smb_field("30"),
+            "creation_time": mock_smb_field(datetime.datetime(2022, 1, 11, 12, 12, 30)),
+            "change_time": mock_smb_field(datetime.datetime(2022, 4, 21, 12, 12, 30)),
+        }
     )
 
-    mock_response._dir_info.fields = mock_stats
-    mock_response.is_dir.return_value = False
-
-    return mock_response
+    return SimpleNamespace(
+        name=name,
+        path=f"\\1.2.3.4/dummy_path/{name}",
+        smb_info=smb_info,
+        _dir_info=smb_info,
+        is_dir=lambda: False,
+        is_file=lambda: True,
+    )
 
 
 def mock_folder(name):
@@ -101,25 +113,23 @@ def mock_folder(name):
     Args:
         name (str): The name of the mocked folder
     """
-    mock_response = mock.Mock()
-    mock_response.name = name
-    mock_response.path = f"\\1.2.3.4/dummy_path/{name}"
-    mock_response.is_dir.return_value = True
-    mock_stats = {}
-    mock_stats["file_id"] = mock.Mock()
-    mock_stats["file_id"].get_value.return_value = "122"
-    mock_stats["end_of_file"] = mock.Mock()
-    mock_stats["end_of_file"].get_value.return_value = "200"
-    mock_stats["creation_time"] = mock.Mock()
-    mock_stats["creation_time"].get_value.return_value = datetime.datetime(
-        2022, 2, 11, 12, 12, 30
+    smb_info = SimpleNamespace(
+        fields={
+            "file_id": mock_smb_field("122"),
+            "end_of_file": mock_smb_field("200"),
+            "creation_time": mock_smb_field(datetime.datetime(2022, 2, 11, 12, 12, 30)),
+            "change_time": mock_smb_field(datetime.datetime(2022, 5, 21, 12, 12, 30)),
+        }
     )
-    mock_stats["change_time"] = mock.Mock()
-    mock_stats["change_time"].get_value.return_value = datetime.datetime(
-        2022, 5, 21, 12, 12, 30
+
+    return SimpleNamespace(
+        name=name,
+        path=f"\\1.2.3.4/dummy_path/{name}",
+        smb_info=smb_info,
+        _dir_info=smb_info,
+        is_dir=lambda: True,
+        is_file=lambda: False,
     )
-    mock_response._dir_info.fields = mock_stats
-    return mock_response
 
 
 def side_effect_function(MAX_CHUNK_SIZE):
@@ -138,8 +148,13 @@ def mock_permission(sid, ace):
     mock_response = {}
 
     class MockSID:
+        _str = None
+
         def __str__(self):
-            return sid
+            # cached like production SIDs, whose string form is computed once
+            if self._str is None:
+                self._str = sid
+            return self._str
 
     mock_response["ace_type"] = mock.Mock()
     mock_response["ace_type"].value = ace
@@ -233,6 +248,19 @@ async def test_create_connection_when_error_occurs(session_mock, side_effect):
             source.smb_connection.create_connection()
 
 
+@pytest.mark.asyncio
+@mock.patch("smbclient.register_session")
+async def test_create_connection_reuses_pooled_session(session_mock):
+    """Tests that sources for the same server share one authenticated session."""
+    async with create_source(NASDataSource) as source:
+        source.smb_connection.create_connection()
+        async with create_source(NASDataSource) as second_source:
+            second_source.smb_connection.create_connection()
+
+            assert session_mock.call_count == 1
+            assert second_source.smb_connection.session is source.smb_connection.session
+
+
 @mock.patch("smbclient.scandir")
 @pytest.mark.asyncio
 async def test_traverse_diretory_with_invalid_path(dir_mock):
@@ -251,6 +279,29 @@ async def test_traverse_diretory_with_invalid_path(dir_mock):
             assert file == []
 
 
+@pytest.mark.asyncio
+@mock.patch("smbclient.scandir")
+@mock.patch("smbclient.register_session")
+@mock.patch("connectors.utils.time_to_sleep_between_retries", mock.Mock(return_value=0))
+async def test_traverse_diretory_reconnects_after_connection_closed(
+    session_mock, dir_mock
+):
+    """Tests that a closed connection drops the pooled session and re-registers."""
+    async with create_source(NASDataSource) as source:
+        source.smb_connection.create_connection()
+        dir_mock.side_effect = [
+            SMBConnectionClosed,
+            [mock_file(name="a1.md")],
+        ]
+
+        documents = [file async for file in source.traverse_diretory(path="some_path")]
+
+        assert len(documents) == 1
+        # The pooled session is stale once the connection closes; recovery must
+        # reach register_session again instead of re-serving it from the pool.
+        assert session_mock.call_count == 2
+
+
 @mock.patch("smbclient.scandir")
 @mock.patch("connectors.utils.time_to_sleep_between_retries", mock.Mock(return_value=0))
 @pytest.mark.asyncio
@@ -282,6 +333,37 @@ async def test_traverse_diretory_retried_on_smb_timeout(dir_mock):
                 assert file == expected_output
 
 
+@pytest.mark.asyncio
+@mock.patch("smbclient.register_session")
+async def test_traverse_diretory_served_from_cache_on_repeat_walk(session):
+    """Tests that a repeated walk is served from the directory cache without scandir calls."""
+    async with create_source(NASDataSource) as source:
+        with mock.patch(
+            "smbclient.scandir", return_value=[mock_file(name="a1.md")]
+        ) as dir_mock:
+            first_walk = [document async for document, _ in source.get_docs()]
+            second_walk = [document async for document, _ in source.get_docs()]
+
+    assert first_walk == second_walk
+    assert dir_mock.call_count == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("smbclient.register_session")
+async def test_traverse_diretory_cache_is_isolated_from_consumer_mutation(session):
+    """Tests that mutating a yielded document does not pollute the cached listing."""
+    async with create_source(NASDataSource) as source:
+        with mock.patch("smbclient.scandir", return_value=[mock_file(name="a1.md")]):
+            first_walk = [document async for document, _ in source.get_docs()]
+            # DLS stamps access control onto yielded documents in place; a
+            # cache-served walk must start from a clean copy each time.
+            for document in first_walk:
+                document[ACCESS_CONTROL] = ["user:stale"]
+            second_walk = [document async for document, _ in source.get_docs()]
+
+    assert all(ACCESS_CONTROL not in document for document in second_walk)
+
+
 @pytest.mark.asyncio
 @mock.patch("smbclient.open_file")
 async def test_fetch_file_when_file_is_inaccessible(file_mock, caplog):
@@ -459,6 +541,55 @@ async def test_fetch_file_when_file_is_accessible(file_mock):
             assert response in [b"Mock....", b""]
 
 
+@pytest.mark.asyncio
+@mock.patch("smbclient.open_file")
+async def test_fetch_file_content_batches_yields(file_mock):
+    """Tests that 64 KB reads are coalesced into 1 MB yields."""
+    chunks = [b"x" * MAX_CHUNK_SIZE] * 32 + [None]
+
+    file_mock.return_value.__enter__.return_value.read = mock.MagicMock(
+        side_effect=lambda chunk_size: chunks.pop(0)
+    )
+
+    async with create_source(NASDataSource) as source:
+        received = []
+        async for chunk in source.fetch_file_content(path="\\1.2.3.4/a/file.txt"):
+            received.append(chunk)
+
+    assert len(received) == 2
+    assert all(len(chunk) == 1 << 20 for chunk in received)
+
+
+@pytest.mark.asyncio
+@mock.patch("smbclient.open_file")
+async def test_fetch_file_content_prefetches_next_chunk(file_mock):
+    """Tests that the next chunk read overlaps with downstream consumption."""
+    chunks = [b"x" * YIELD_THRESHOLD] * 2 + [None]
+    second_read_started = threading.Event()
+
+    def tracked_read(chunk_size):
+        if len(chunks) == 2:
+            second_read_started.set()
+        return chunks.pop(0)
+
+    file_mock.return_value.__enter__.return_value.read = mock.MagicMock(
+        side_effect=tracked_read
+    )
+
+    async with create_source(NASDataSource) as source:
+        received = []
+        async for chunk in source.fetch_file_content(path="\\1.2.3.4/a/file.txt"):
+            if not received:
+                # While the first chunk is still being consumed downstream,
+                # the second read must already be running in a worker thread.
+                # A generous timeout replaces a wall-clock bound so a loaded
+                # CI host cannot flake the test.
+                assert await asyncio.to_thread(second_read_started.wait, 5)
+            received.append(chunk)
+
+    assert received == [b"x" * YIELD_THRESHOLD] * 2
+
+
 @pytest.mark.asyncio
 async def test_close_without_session():
     async with create_source(NASDataSource) as source:
@@ -673,9 +804,246 @@ async def test_get_docs_for_syncrule_negative(session, filtering):
             "smbclient.scandir",
             return_value=[MockFile("\\1.2.3.4/training/python/training.py")],
         ):
+            source.format_document = MagicMock()
             async for document in source.get_docs(filtering):
                 assert document is not None
 
+            # non-matching entries are skipped before any document is built
+            source.format_document.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_format_document_uses_isoformat_timestamps():
+    """Tests that timestamps are emitted through datetime.isoformat, not strftime."""
+    async with create_source(NASDataSource) as source:
+        file = mock_file(name="a1.md")
+        document = source.format_document(file=file)
+
+        assert (
+            document["created_at"]
+            == datetime.datetime(2022, 1, 11, 12, 12, 30).isoformat()
+        )
+        assert (
+            document["_timestamp"]
+            == datetime.datetime(2022, 4, 21, 12, 12, 30).isoformat()
+        )
+
+
+def test_sid_to_rid_memoizes_and_interns():
+    from connectors.sources.network_drive import _sid_to_rid
+
+    _sid_to_rid.cache_clear()
+    first = _sid_to_rid("S-1-5-21-111-222")
+    second = _sid_to_rid("S-1-5-21-111-222")
+
+    assert first == "222"
+    assert first is second
+
+
+def test_match_glob_compiles_pattern_once():
+    from connectors.sources.network_drive import _compile_glob, _match_glob
+
+    _compile_glob.cache_clear()
+    with mock.patch(
+        "connectors.sources.network_drive.glob.translate",
+        wraps=__import__("wcmatch.glob", fromlist=["glob"]).translate,
+    ) as mock_translate:
+        assert _match_glob("training/python/training.py", "training/**")
+        assert _match_glob("training/python/async.py", "training/**")
+        assert not _match_glob("other/file.py", "training/**")
+
+    assert mock_translate.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_is_match_with_previous_rules_uses_one_union_regex():
+    from connectors.sources.network_drive import _compile_glob_union
+
+    _compile_glob_union.cache_clear()
+    indexed_rules = ["training/python/**", "training/java/**"]
+    async with create_source(NASDataSource) as source:
+        assert source.is_match_with_previous_rules(
+            "training/python/training.py", indexed_rules, False
+        )
+        assert not source.is_match_with_previous_rules(
+            "other/file.py", indexed_rules, False
+        )
+        assert source.is_match_with_previous_rules("other/file.py", indexed_rules, True)
+
+    # both checks against the rule set share one compiled alternation
+    assert _compile_glob_union.cache_info().misses == 1
+
+
+@pytest.mark.asyncio
+@mock.patch("smbclient.register_session")
+async def test_fetch_filtered_directory_traverses_rules_concurrently(session):
+    filtering = Filter(
+        {
+            ADVANCED_SNIPPET: {
+                "value": [
+                    {"pattern": "training/python/**"},
+                    {"pattern": "training/java/**"},
+                ]
+            }
+        }
+    )
+
+    # The barrier only releases when both rule traversals have a scandir in
+    # flight at the same time; sequential walks would deadlock and break it.
+    barrier = threading.Barrier(2)
+
+    def concurrent_scandir(*args, **kwargs):
+        barrier.wait(timeout=5)
+        return [MockFile("\\1.2.3.4/training/python/training.py")]
+
+    async with create_source(NASDataSource) as source:
+        with mock.patch("smbclient.scandir", side_effect=concurrent_scandir):
+            source.format_document = MagicMock(
+                return_value={
+                    "_id": "1",
+                    "_timestamp": "2022-04-21T12:12:30",
+                    "path": "\\1.2.3.4/training/python/training.py",
+                    "title": "training.py",
+                    "created_at": "2022-01-11T12:12:30",
+                    "size": "30",
+                    "type": "file",
+                }
+            )
+            documents = []
+            async for document, _ in source.get_docs(filtering):
+                documents.append(document)
+
+    assert len(documents) == 1
+    assert not barrier.broken
+
+
+@pytest.mark.asyncio
+@mock.patch("smbclient.register_session")
+async def test_fetch_filtered_directory_bounds_document_queue(session):
+    """Tests that the document queue applies backpressure to the walks."""
+    filtering = Filter(
+        {ADVANCED_SNIPPET: {"value": [{"pattern": "training/python/**"}]}}
+    )
+    async with create_source(NASDataSource) as source:
+        with mock.patch(
+            "smbclient.scandir",
+            return_value=[MockFile("\\1.2.3.4/training/python/training.py")],
+        ):
+            source.format_document = MagicMock(
+                return_value={"path": "x", "type": "folder"}
+            )
+            with mock.patch.object(asyncio, "Queue", wraps=asyncio.Queue) as queue_mock:
+                async for _ in source.get_docs(filtering):
+                    pass
+
+    from connectors.sources.network_drive import DOC_QUEUE_MAX_SIZE
+
+    queue_mock.assert_called_once_with(maxsize=DOC_QUEUE_MAX_SIZE)
+
+
+@pytest.mark.asyncio
+@mock.patch("smbclient.register_session")
+async def test_traverse_directory_for_syncrule_pipelines_scandir(session):
+    """Tests that sibling directories are listed in one concurrent wave."""
+    root = "\\1.2.3.4/training/"
+    subdirs = [
+        SimpleNamespace(path="\\1.2.3.4/training/python", is_dir=lambda: True),
+        SimpleNamespace(path="\\1.2.3.4/training/java", is_dir=lambda: True),
+    ]
+
+    # The barrier only releases when both subdirectory listings are in flight
+    # at the same time; a serial walk would deadlock and break it.
+    barrier = threading.Barrier(2)
+
+    def tracked_scandir(path, **kwargs):
+        if path == root:
+            return subdirs
+        barrier.wait(timeout=5)
+        return []
+
+    async with create_source(NASDataSource) as source:
+        source.format_document = MagicMock(return_value={"path": "x"})
+        with mock.patch("smbclient.scandir", side_effect=tracked_scandir):
+            documents = []
+            async for document in source.traverse_directory_for_syncrule(
+                path=root, glob_pattern="training/**", indexed_rules=[]
+            ):
+                documents.append(document)
+
+    assert len(documents) == 2
+    assert not barrier.broken
+
+
+@pytest.mark.asyncio
+@mock.patch("smbclient.register_session")
+async def test_get_docs_for_syncrule_pushes_leaf_search_pattern(session):
+    """Tests that a leaf-only glob is pushed down to the SMB server."""
+    filtering = Filter(
+        {ADVANCED_SNIPPET: {"value": [{"pattern": "training/python/async*"}]}}
+    )
+    async with create_source(NASDataSource) as source:
+        with mock.patch("smbclient.scandir", return_value=[]) as dir_mock:
+            async for _ in source.get_docs(filtering):
+                pass
+
+    assert dir_mock.call_args.kwargs["search_pattern"] == "async*"
+
+
+@pytest.mark.asyncio
+@mock.patch("smbclient.register_session")
+async def test_get_docs_for_syncrule_collapses_subsumed_patterns(session):
+    """Tests that a rule covered by a broader `**` rule is walked only once."""
+    filtering = Filter(
+        {
+            ADVANCED_SNIPPET: {
+                "value": [
+                    {"pattern": "training/python/**"},
+                    {"pattern": "training/**"},
+                ]
+            }
+        }
+    )
+    async with create_source(NASDataSource) as source:
+        with mock.patch(
+            "smbclient.scandir",
+            return_value=[MockFile("\\1.2.3.4/training/python/training.py")],
+        ) as dir_mock:
+            source.format_document = MagicMock(
+                return_value={
+                    "_id": "1",
+                    "_timestamp": "2022-04-21T12:12:30",
+                    "path": "\\1.2.3.4/training/python/training.py",
+                    "title": "training.py",
+                    "created_at": "2022-01-11T12:12:30",
+                    "size": "30",
+                    "type": "file",
+                }
+            )
+            documents = []
+            async for document, _ in source.get_docs(filtering):
+                documents.append(document)
+
+    assert len(documents) == 1
+    assert dir_mock.call_count == 1
+    assert dir_mock.call_args.kwargs["path"] == rf"\\{source.server_ip}/training/"
+
+
+@pytest.mark.parametrize(
+    "pattern, expected_search_pattern",
+    [
+        ("training/python/async*", "async*"),
+        ("training/python/**", "*"),
+        ("training/*/file.txt", "*"),
+        ("training/python", "*"),
+        ("training/logs/report[12].txt", "*"),
+        ("training/logs/report{1,2}.txt", "*"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_get_search_pattern(pattern, expected_search_pattern):
+    async with create_source(NASDataSource) as source:
+        assert source.get_search_pattern(pattern) == expected_search_pattern
+
 
 def test_parse_output():
     security_object = SecurityInfo("user", "password", "0.0.0.0")
@@ -696,6 +1064,41 @@ def test_parse_output():
     assert formatted_result == expected_result
 
 
+def test_parse_output_with_right_padded_columns():
+    """Tests that rows with trailing column padding are not dropped."""
+    security_object = SecurityInfo("user", "password", "0.0.0.0")
+
+    raw_output = mock.Mock()
+    raw_output.std_out.decode.return_value = (
+        "\n"
+        "            Header1  Value1      \n"
+        "            Header2  Value2      \n"
+        "            Key 1    Value1      \n"
+        "            Key 2    Value2\n"
+        "        "
+    )
+
+    formatted_result = security_object.parse_output(raw_output)
+
+    assert formatted_result == {"Key 1": "Value1", "Key 2": "Value2"}
+
+
+def test_parse_output_with_large_listing():
+    security_object = SecurityInfo("user", "password", "0.0.0.0")
+
+    rows = "\n".join(f"            User {i}  S-1-11-{i}" for i in range(10000))
+    raw_output = mock.Mock()
+    raw_output.std_out.decode.return_value = (
+        f"\n            Header  Value\n            ======  =====\n{rows}\n"
+    )
+
+    formatted_result = security_object.parse_output(raw_output)
+
+    assert len(formatted_result) == 10000
+    assert formatted_result["User 0"] == "S-1-11-0"
+    assert formatted_result["User 9999"] == "S-1-11-9999"
+
+
 def test_fetch_users():
     security_object = SecurityInfo("user", "password", "0.0.0.0")
 
@@ -742,6 +1145,74 @@ def test_fetch_groups():
     assert users == expected_result
 
 
+def test_fetch_users_served_from_cache():
+    security_object = SecurityInfo("user", "password", "0.0.0.0")
+
+    sample_data = mock.Mock()
+    sample_data.std_out.decode.return_value = """
+            Header  Value
+            ======  =====
+            User A  S-1-11-111
+        """
+    security_object.session.run_ps = mock.Mock(return_value=sample_data)
+
+    first = security_object.fetch_users()
+    second = security_object.fetch_users()
+
+    assert first == second == {"User A": "S-1-11-111"}
+    assert security_object.session.run_ps.call_count == 1
+
+
+def test_fetch_users_refetched_after_ttl_expiry():
+    security_object = SecurityInfo("user", "password", "0.0.0.0")
+
+    sample_data = mock.Mock()
+    sample_data.std_out.decode.return_value = """
+            Header  Value
+            ======  =====
+            User A  S-1-11-111
+        """
+    security_object.session.run_ps = mock.Mock(return_value=sample_data)
+
+    fake_clock = 1000.0
+    with mock.patch(
+        "connectors.sources.network_drive.time.monotonic",
+        side_effect=lambda: fake_clock,
+    ):
+        security_object.fetch_users()
+        fake_clock += 301
+        security_object.fetch_users()
+
+    assert security_object.session.run_ps.call_count == 2
+
+
+def test_fetch_members_batch():
+    security_object = SecurityInfo("user", "password", "0.0.0.0")
+
+    sample_data = mock.Mock()
+    sample_data.std_out.decode.return_value = """
+            GROUP:Group 1
+            Name    SID
+            ====    ===
+            User 1  S-1-11-111
+            User 2  S-2-22-222
+            GROUP:Group 2
+            Name    SID
+            ====    ===
+            User 3  S-3-33-333
+        """
+    security_object.session.run_ps = mock.Mock(return_value=sample_data)
+
+    members = security_object.fetch_members_batch(group_names=["Group 1", "Group 2"])
+    expected_result = {
+        "Group 1": {"User 1": "S-1-11-111", "User 2": "S-2-22-222"},
+        "Group 2": {"User 3": "S-3-33-333"},
+    }
+
+    assert members == expected_result
+    assert security_object.session.run_ps.call_count == 1
+
+
 def test_fetch_members():
     security_object = SecurityInfo("user", "password", "0.0.0.0")
 
@@ -765,6 +1236,38 @@ def test_fetch_members():
     assert users == expected_result
 
 
+@mock.patch("connectors.sources.network_drive.winrm.Session")
+def test_fetch_calls_share_one_winrm_session(winrm_session_mock):
+    """Tests that chained fetch_* calls reuse a single WinRM session."""
+    security_object = SecurityInfo("user", "password", "0.0.0.0")
+
+    sample_data = mock.Mock()
+    sample_data.std_out.decode.return_value = """
+            Header  Value
+            ======  =====
+            User A  S-1-11-111
+        """
+    winrm_session_mock.return_value.run_ps = mock.Mock(return_value=sample_data)
+
+    security_object.fetch_users()
+    security_object.fetch_groups()
+    security_object.fetch_members(group_name="Group 1")
+    security_object.fetch_members_batch(group_names=["Group 1"])
+
+    assert winrm_session_mock.call_count == 1
+
+
+@mock.patch("connectors.sources.network_drive.winrm.Session")
+def test_security_info_close_discards_session(winrm_session_mock):
+    security_object = SecurityInfo("user", "password", "0.0.0.0")
+
+    session = security_object.session
+    security_object.close()
+
+    session.protocol.transport.close_session.assert_called_once()
+    assert "session" not in security_object.__dict__
+
+
 @pytest.mark.asyncio
 async def test_get_access_control_dls_disabled():
     async with create_source(NASDataSource) as source:
@@ -789,19 +1292,18 @@ async def test_get_access_control_linux_empty_csv_file_path():
 
 
 @pytest.mark.asyncio
-async def test_get_access_control_linux():
+async def test_get_access_control_linux(tmp_path):
     async with create_source(NASDataSource) as source:
         source._dls_enabled = MagicMock(return_value=True)
         source.drive_type = LINUX
-        source.identity_mappings = "/a/b"
-        with mock.patch(
-            "builtins.open",
-            mock.mock_open(read_data="user1;S-1;S-11,S-22\nuser2;S-2;S-22"),
-        ):
-            acl = []
-            async for access_control in source.get_access_control():
-                acl.append(access_control)
-            assert len(acl) == 2
+        csv_file = tmp_path / "identity_mappings.csv"
+        csv_file.write_text("user1;S-1;S-11,S-22\nuser2;S-2;S-22")
+        source.identity_mappings = str(csv_file)
+
+        acl = []
+        async for access_control in source.get_access_control():
+            acl.append(access_control)
+        assert len(acl) == 2
 
 
 @pytest.mark.asyncio
@@ -810,16 +1312,17 @@ async def test_fetch_groups_info():
     mock_group_members = {
         "Administrator": "S-1-5-21-227823342-1368486282-703244805-500"
     }
-    excepted_result = {
-        "546": {"Administrator": "S-1-5-21-227823342-1368486282-703244805-500"}
-    }
+    excepted_result = {"546": {"rid:500"}}
     async with create_source(NASDataSource) as source:
         with mock.patch.object(SecurityInfo, "fetch_groups", return_value=mock_groups):
             with mock.patch.object(
-                SecurityInfo, "fetch_members", return_value=mock_group_members
-            ):
+                SecurityInfo,
+                "fetch_members_batch",
+                return_value={"Admins": mock_group_members},
+            ) as mock_members_batch:
                 groups_info = await source.fetch_groups_info()
         assert groups_info == excepted_result
+        mock_members_batch.assert_called_once_with(["Admins"])
 
 
 @pytest.mark.asyncio
@@ -855,6 +1358,30 @@ async def test_get_access_control_dls_enabled():
         assert expected_user_access_control == user_access_control
 
 
+@pytest.mark.asyncio
+async def test_get_access_control_dls_enabled_batches_users():
+    mock_users = {f"User{i}": f"S-1-5-21-0-0-0-{i}" for i in range(1200)}
+
+    async with create_source(NASDataSource) as source:
+        source._dls_enabled = MagicMock(return_value=True)
+        source.drive_type = WINDOWS
+
+        real_gather = asyncio.gather
+        with mock.patch.object(
+            asyncio, "gather", side_effect=real_gather
+        ) as mock_gather:
+            with mock.patch.object(
+                SecurityInfo, "fetch_users", return_value=mock_users
+            ):
+                user_docs = []
+                async for user_doc in source.get_access_control():
+                    user_docs.append(user_doc)
+
+        assert len(user_docs) == 1200
+        # 1200 users at a batch size of 500 make three gather rounds
+        assert mock_gather.call_count == 3
+
+
 @pytest.mark.asyncio
 async def test_get_access_control_without_duplicate_ids():
     async with create_source(NASDataSource) as source:
@@ -877,6 +1404,29 @@ async def test_get_access_control_without_duplicate_ids():
         assert len(seen_users) == 3
 
 
+@pytest.mark.asyncio
+async def test_get_access_control_skips_duplicate_sids():
+    async with create_source(NASDataSource) as source:
+        source._dls_enabled = MagicMock(return_value=True)
+        source.drive_type = LINUX
+        source.identity_mappings = "/a/b"
+
+        source.read_user_info_csv = MagicMock(
+            return_value=[
+                {"name": "user1", "user_sid": "S-1", "groups": ["S-11"]}
+                for _ in range(1000)
+            ]
+            + [{"name": "user2", "user_sid": "S-2", "groups": []}]
+        )
+
+        acl = []
+        async for access_control in source.get_access_control():
+            acl.append(access_control)
+
+        # only one doc per unique SID is built and emitted
+        assert len(acl) == 2
+
+
 @mock.patch.object(
     NASDataSource,
     "traverse_diretory",
@@ -959,8 +1509,20 @@ async def test_get_docs_without_dls_enabled(mock_get_files, mock_fetch_groups, s
     NASDataSource,
     "list_file_permission",
     side_effect=[
-        [mock_permission("S-2-21-211-2112", 0), mock_permission("S-1-11-111-1111", 0)],
-        [mock_permission("S-3-31-131-1131", 0), mock_permission("S-1-11-111-1111", 0)],
+        (
+            [
+                mock_permission("S-2-21-211-2112", 0),
+                mock_permission("S-1-11-111-1111", 0),
+            ],
+            b"dacl-1",
+        ),
+        (
+            [
+                mock_permission("S-3-31-131-1131", 0),
+                mock_permission("S-1-11-111-1111", 0),
+            ],
+            b"dacl-2",
+        ),
     ],
 )
 @mock.patch.object(
@@ -970,8 +1532,11 @@ async def test_get_docs_without_dls_enabled(mock_get_files, mock_fetch_groups, s
 )
 @mock.patch.object(
     SecurityInfo,
-    "fetch_members",
-    side_effect=[{"User1": "S-1-11-111-1111"}, {"User2": "S-2-21-211-2111"}],
+    "fetch_members_batch",
+    return_value={
+        "Admins": {"User1": "S-1-11-111-1111"},
+        "IT": {"User2": "S-2-21-211-2111"},
+    },
 )
 @mock.patch.object(
     SecurityInfo,
@@ -1007,41 +1572,55 @@ async def test_get_docs_with_dls_enabled(
 
 
 @pytest.mark.asyncio
-async def test_read_csv_with_valid_data():
+async def test_read_csv_with_valid_data(tmp_path):
     async with create_source(NASDataSource) as source:
-        with mock.patch(
-            "builtins.open",
-            mock.mock_open(read_data="user1;S-1;S-11,S-22\nuser2;S-2;S-22"),
-        ):
-            user_info = source.read_user_info_csv()
-            expected_user_info = [
-                {"name": "user1", "user_sid": "S-1", "groups": ["S-11", "S-22"]},
-                {"name": "user2", "user_sid": "S-2", "groups": ["S-22"]},
-            ]
-            assert user_info == expected_user_info
+        csv_file = tmp_path / "identity_mappings.csv"
+        csv_file.write_text("user1;S-1;S-11,S-22\nuser2;S-2;S-22")
+        source.identity_mappings = str(csv_file)
+
+        user_info = list(source.read_user_info_csv())
+        expected_user_info = [
+            {"name": "user1", "user_sid": "S-1", "groups": ["S-11", "S-22"]},
+            {"name": "user2", "user_sid": "S-2", "groups": ["S-22"]},
+        ]
+        assert user_info == expected_user_info
 
 
 @pytest.mark.asyncio
-async def test_read_csv_file_erroneous():
+async def test_read_csv_file_erroneous(tmp_path):
     async with create_source(NASDataSource) as source:
-        with mock.patch("builtins.open", mock.mock_open(read_data="0I`00�^")):
-            with mock.patch("csv.reader", side_effect=csv.Error):
-                user_info = source.read_user_info_csv()
-                assert user_info == []
+        csv_file = tmp_path / "identity_mappings.csv"
+        csv_file.write_text("0I`00�^")
+        source.identity_mappings = str(csv_file)
+
+        user_info = list(source.read_user_info_csv())
+        assert user_info == []
 
 
 @pytest.mark.asyncio
-async def test_read_csv_with_empty_groups():
+async def test_read_csv_empty_file(tmp_path):
     async with create_source(NASDataSource) as source:
-        with mock.patch(
-            "builtins.open", mock.mock_open(read_data="user1;1;\nuser2;2;")
-        ):
-            user_info = source.read_user_info_csv()
-            expected_user_info = [
-                {"name": "user1", "user_sid": "1", "groups": []},
-                {"name": "user2", "user_sid": "2", "groups": []},
-            ]
-            assert user_info == expected_user_info
+        csv_file = tmp_path / "identity_mappings.csv"
+        csv_file.write_text("")
+        source.identity_mappings = str(csv_file)
+
+        user_info = list(source.read_user_info_csv())
+        assert user_info == []
+
+
+@pytest.mark.asyncio
+async def test_read_csv_with_empty_groups(tmp_path):
+    async with create_source(NASDataSource) as source:
+        csv_file = tmp_path / "identity_mappings.csv"
+        csv_file.write_text("user1;1;\nuser2;2;")
+        source.identity_mappings = str(csv_file)
+
+        user_info = list(source.read_user_info_csv())
+        expected_user_info = [
+            {"name": "user1", "user_sid": "1", "groups": []},
+            {"name": "user2", "user_sid": "2", "groups": []},
+        ]
+        assert user_info == expected_user_info
 
 
 @pytest.mark.asyncio
@@ -1053,16 +1632,17 @@ async def test_list_file_permissions(mock_get_descriptor):
         mock_get_descriptor.return_value = mock_descriptor
         mock_dacl = {"aces": ["ace1", "ace2"]}
         mock_descriptor.get_dacl.return_value = mock_dacl
+        mock_descriptor.pack.return_value = b"raw-descriptor"
 
         async with create_source(NASDataSource) as source:
-            result = source.list_file_permission(
+            aces, digest = source.list_file_permission(
                 file_path="/path/to/file.txt",
                 file_type="file",
-                mode="rb",
                 access="read",
             )
 
-            assert result == mock_dacl["aces"]
+            assert aces == mock_dacl["aces"]
+            assert digest == hashlib.sha1(b"raw-descriptor").digest()  # noqa S324
 
 
 @pytest.mark.asyncio
@@ -1074,7 +1654,6 @@ async def test_list_file_permissions_with_inaccessible_file():
             result = source.list_file_permission(
                 file_path="/path/to/file.txt",
                 file_type="file",
-                mode="rb",
                 access="read",
             )
 
@@ -1085,13 +1664,16 @@ async def test_list_file_permissions_with_inaccessible_file():
 @mock.patch.object(
     NASDataSource,
     "list_file_permission",
-    return_value=[
-        mock_permission(sid="S-2-21-211-411", ace=0),  # User with allow permission
-        mock_permission(sid="S-1-11-10", ace=1),  # Group with Deny permission
-    ],
+    return_value=(
+        [
+            mock_permission(sid="S-2-21-211-411", ace=0),  # User with allow permission
+            mock_permission(sid="S-1-11-10", ace=1),  # Group with Deny permission
+        ],
+        b"dacl-deny",
+    ),
 )
 async def test_deny_permission_has_precedence_over_allow(mock_list_file_permission):
-    mock_groups_info = {"10": {"admin": "S-2-21-211-411"}}
+    mock_groups_info = {"10": {"rid:411"}}
     expected_result = []
     async with create_source(NASDataSource) as source:
         source._dls_enabled = MagicMock(return_value=True)
@@ -1108,16 +1690,51 @@ async def test_deny_permission_has_precedence_over_allow(mock_list_file_permissi
 @mock.patch.object(
     NASDataSource,
     "list_file_permission",
-    return_value=[
-        mock_permission(sid="S-2-21-211-411", ace=0),  # User 1 with allow permission
-        mock_permission(sid="S-3-23-222-221", ace=1),  # User 2 with deny permission
-        mock_permission(sid="S-1-11-11", ace=0),  # Group with allow permission
-    ],
+    return_value=(
+        [
+            mock_permission(sid="S-2-21-211-411", ace=0),
+            mock_permission(sid="S-1-11-10", ace=1),
+        ],
+        b"dacl-shared",
+    ),
+)
+async def test_entity_permissions_cached_per_dacl(mock_list_file_permission):
+    """Tests that files sharing a DACL reuse one reduced permission set."""
+    mock_groups_info = {"10": {"rid:411"}}
+    async with create_source(NASDataSource) as source:
+        source._dls_enabled = MagicMock(return_value=True)
+        first = await source.get_entity_permission(
+            file_path="dummy_url/file1",
+            file_type="file",
+            groups_info=mock_groups_info,
+        )
+        second = await source.get_entity_permission(
+            file_path="dummy_url/file2",
+            file_type="file",
+            groups_info=mock_groups_info,
+        )
+
+        assert second is first
+        assert len(source._dacl_cache) == 1
+
+
+@pytest.mark.asyncio
+@mock.patch.object(
+    NASDataSource,
+    "list_file_permission",
+    return_value=(
+        [
+            mock_permission(sid="S-2-21-211-411", ace=0),  # User 1, allow
+            mock_permission(sid="S-3-23-222-221", ace=1),  # User 2, deny
+            mock_permission(sid="S-1-11-11", ace=0),  # Group, allow
+        ],
+        b"dacl-group",
+    ),
 )
 async def test_group_allow_ace_member1_allow_member2_deny_ace_then_member1_has_access(
     mock_list_file_permission,
 ):
-    mock_groups_info = {"11": {"user-1": "S-2-21-211-411", "user-2": "S-3-23-222-221"}}
+    mock_groups_info = {"11": {"rid:411", "rid:221"}}
     expected_result = ["rid:411"]  # Only User-1 should have access
     async with create_source(NASDataSource) as source:
         source._dls_enabled = MagicMock(return_value=True)